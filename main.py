@@ -1,7 +1,7 @@
 import pygame
 import sys
-import math
 import random
+import numpy as np
 from collections import defaultdict
 from time_travel import *
 
@@ -22,14 +22,50 @@ TIMELINE_COLORS = [
 
 MAX_REWINDS = 3
 rewind_charges = MAX_REWINDS
+
+# The command logs grow every frame the player moves or shoots; compact
+# them periodically so per-frame scans stay bounded in long sessions.
+# Commands older than the history window are only kept while a live
+# timeline still ghosts them (rewinding further back than the window
+# won't find move history to ghost, which is the trade-off).
+COMPACT_INTERVAL_FRAMES = 60
+HISTORY_WINDOW = 30.0  # seconds of past commands kept for rewind ghosting
+frame_count = 0
 active_timelines = defaultdict(int)
 timeline_counter = 0
 
 world = GameWorld()
 
+# The time field source and radius never move, so the heatmap is static.
+# Compute the whole 80x60 intensity grid in one vectorized pass (same
+# formula as get_time_factor), upscale to screen size, and blit the
+# cached surface each frame instead of doing 4800 fill calls.
+HEATMAP_GRID_X, HEATMAP_GRID_Y = np.meshgrid(
+    np.arange(0, 800, 10), np.arange(0, 600, 10), indexing="ij"
+)
+
+def build_heatmap(cx, cy, radius):
+    # Whole-grid kernel so a moving field source only costs one rebuild,
+    # never a per-cell Python loop. The distance clamp already zeroes
+    # any cell outside the radius, so no per-cell culling is needed.
+    t = np.minimum(
+        np.sqrt((HEATMAP_GRID_X - cx) ** 2 + (HEATMAP_GRID_Y - cy) ** 2) / radius, 1.0
+    )
+    intensity = (255 * (1.0 - t) ** 2.3).astype(np.uint8)
+    rgb = np.zeros((80, 60, 3), dtype=np.uint8)
+    rgb[..., 0] = intensity
+    small = pygame.Surface((80, 60))
+    pygame.surfarray.blit_array(small, rgb)
+    # Let pygame do the 10x upscale instead of np.repeat-ing a full
+    # 800x600x3 array into existence
+    return pygame.transform.scale(small, (800, 600))
+
+heatmap_surf = build_heatmap(400, 300, 500)
+
 class Bullet(TimeEntity):
     def __init__(self, pos, velocity, bullet_id, max_lifetime=1.4):
         super().__init__(pos, color=(255, 200, 50), max_lifetime=max_lifetime)
+        self.kind = KIND_BULLET
         self.velocity = velocity
         self.bullet_id = bullet_id
         self.movement = MovementComponent()
@@ -38,19 +74,23 @@ class Bullet(TimeEntity):
     def update(self, dt, global_time, rewinding=False):
         super().update(dt, global_time, rewinding)
         self.pos = self.movement.get_pos(self.local_time)
+        self.draw_pos = (int(self.pos.x), int(self.pos.y))
 
 class GhostBullet(Bullet):
     def __init__(self, spawn_time, pos, velocity, global_time, max_lifetime=2.5, color=(200, 200, 200), timeline_id=0):
         super().__init__(pos, velocity, bullet_id=-1, max_lifetime=max_lifetime)
+        self.kind = KIND_GHOST_BULLET
         self.spawn_time = spawn_time
         self.ghost = True
         self.color = color
         self.timeline_id = timeline_id
+        self.cmd_ref = None
         self._update_pos(global_time)
 
     def _update_pos(self, global_time):
         self.local_time = max(0, global_time - self.spawn_time)
         self.pos = self.movement.get_pos(self.local_time)
+        self.draw_pos = (int(self.pos.x), int(self.pos.y))
 
     def update(self, dt, global_time, rewinding=False):
         if global_time < self.spawn_time:
@@ -60,43 +100,47 @@ class GhostBullet(Bullet):
 
 def prune_future_bullet_spawns(world, time_point, new_timeline_id, just_overwritten_timeline_id):
     ghosts_created = False
-    for cmd in world.permanent_command_log:
-        if hasattr(cmd, "forward_fn") and getattr(cmd.forward_fn, "__name__", "") == "shoot_bullet":
-            if (
-                cmd.origin_timeline == just_overwritten_timeline_id and
-                cmd.scheduled_time > time_point and
-                new_timeline_id not in cmd.ghosted_timelines
-            ):
-                # spawn ghost as before...
-                cmd.ghosted_timelines.add(new_timeline_id)
-                data = cmd.data
-                pos = data["pos"].copy()
-                velocity = data["velocity"]
-                max_lifetime = data.get("max_lifetime", 2.5)
-                color = TIMELINE_COLORS[new_timeline_id % len(TIMELINE_COLORS)]
-                ghost = GhostBullet(cmd.scheduled_time, pos, velocity, world.global_time, max_lifetime, color=color, timeline_id=new_timeline_id)
-                world.entities.append(ghost)
-                active_timelines[new_timeline_id] += 1
-                ghosts_created = True
-                cmd.ghosted_timelines.add(new_timeline_id)
-                if cmd in world.global_commands:
-                    world.global_commands.remove(cmd)
+    ghosted_cmd_ids = set()
+    for cmd in world.bullet_spawn_log:
+        if (
+            cmd.origin_timeline == just_overwritten_timeline_id and
+            cmd.scheduled_time > time_point and
+            new_timeline_id not in cmd.ghosted_timelines
+        ):
+            # spawn ghost as before...
+            cmd.ghosted_timelines.add(new_timeline_id)
+            data = cmd.data
+            pos = data["pos"].copy()
+            velocity = data["velocity"]
+            max_lifetime = data.get("max_lifetime", 2.5)
+            color = TIMELINE_COLORS[new_timeline_id % len(TIMELINE_COLORS)]
+            ghost = GhostBullet(cmd.scheduled_time, pos, velocity, world.global_time, max_lifetime, color=color, timeline_id=new_timeline_id)
+            ghost.cmd_ref = cmd
+            world.add_entity(ghost)
+            active_timelines[new_timeline_id] += 1
+            ghosts_created = True
+            ghosted_cmd_ids.add(id(cmd))
+    if ghosted_cmd_ids:
+        world.global_commands[:] = [
+            c for c in world.global_commands if id(c) not in ghosted_cmd_ids
+        ]
     return ghosts_created
 
 def shoot_bullet(world, data):
     bullet = Bullet(data["pos"], data["velocity"], data["bullet_id"])
-    world.entities.append(bullet)
+    world.add_entity(bullet)
 
 def undo_bullet(world, data):
     bullet_id = data.get("bullet_id")
-    for b in list(world.entities):
-        if isinstance(b, Bullet) and getattr(b, "bullet_id", None) == bullet_id:
-            world.entities.remove(b)
+    for b in list(world.bullets):
+        if b.bullet_id == bullet_id:
+            world.remove_entity(b)
             break
 
 class GhostPlayer(TimeEntity):
     def __init__(self, movement_path, color=(180, 180, 255), timeline_id=0):
         super().__init__(movement_path[0][1], color=color)
+        self.kind = KIND_GHOST_PLAYER
         self.movement = MovementComponent()
         self.movement.path = movement_path
         self.ghost = True
@@ -106,10 +150,12 @@ class GhostPlayer(TimeEntity):
         # Always use world/global time for ghosts (not pruned/overwritten)
         self.local_time = global_time
         self.pos = self.movement.get_pos(self.local_time)
+        self.draw_pos = (int(self.pos.x), int(self.pos.y))
 
 class Player(TimeEntity):
     def __init__(self, pos, move_speed=170):
         super().__init__(pos, color=(80, 220, 100))
+        self.kind = KIND_PLAYER
         self.shoot_cooldown = 0.15  # seconds between shots
         self.last_shot_time = 0
         self.move_speed = move_speed
@@ -119,14 +165,18 @@ class Player(TimeEntity):
     def update(self, dt, global_time, rewinding=False):
         self.pos = self.movement.get_pos(self.local_time)
         super().update(dt, global_time, rewinding)
+        self.draw_pos = (int(self.pos.x), int(self.pos.y))
 
     def can_shoot(self):
         return (self.local_time - self.last_shot_time) >= self.shoot_cooldown
 
     def shoot(self, target_pos, world):
-        angle = math.atan2(target_pos[1] - self.pos.y, target_pos[0] - self.pos.x)
         speed = 250
-        velocity = pygame.Vector2(math.cos(angle), math.sin(angle)) * speed
+        direction = pygame.Vector2(target_pos[0] - self.pos.x, target_pos[1] - self.pos.y)
+        if direction.length_squared() > 0:
+            velocity = direction.normalize() * speed
+        else:
+            velocity = pygame.Vector2(speed, 0)
         bullet_id = random.randint(1, 1_000_000_000)
         bullet_data = {
             "pos": self.pos.copy(),
@@ -140,43 +190,53 @@ class Player(TimeEntity):
             backward_fn=undo_bullet,
             scheduled_time=self.local_time + 0.01
         )
+        cmd.kind = CMD_SHOOT
         cmd.origin_timeline = world.current_timeline_id  # set to current timeline
         cmd.ghosted_timelines = set()
         world.global_commands.append(cmd)
         world.permanent_command_log.append(cmd)
+        world.bullet_spawn_log.append(cmd)
         cmd.execute()
         self.last_shot_time = self.local_time
 
 def prune_future_player_moves(world, time_point, new_timeline_id, just_overwritten_timeline_id):
     ghosts_created = False
-    # Collect all player move commands to be ghosted as a path
+    # Collect all player move commands to be ghosted as a path. Moves
+    # are only recorded while time runs forward (the input block skips
+    # recording during rewind), so each timeline's slice of the move
+    # log has strictly increasing scheduled_times and the collected
+    # path is already in time order — no sort needed here. If recording
+    # ever happens during rewind again, that invariant breaks and this
+    # path must be sorted before caching.
     ghost_path = []
-    for cmd in world.permanent_command_log:
-        if getattr(cmd, "type", None) == "player_move":
-            if (
-                cmd.origin_timeline == just_overwritten_timeline_id and
-                cmd.scheduled_time > time_point and
-                new_timeline_id not in cmd.ghosted_timelines
-            ):
-                ghost_path.append((cmd.scheduled_time, cmd.data["pos"].copy()))
-                cmd.ghosted_timelines.add(new_timeline_id)
+    for cmd in world.player_move_log:
+        if (
+            cmd.origin_timeline == just_overwritten_timeline_id and
+            cmd.scheduled_time > time_point and
+            new_timeline_id not in cmd.ghosted_timelines
+        ):
+            ghost_path.append((cmd.scheduled_time, cmd.data["pos"].copy()))
+            cmd.ghosted_timelines.add(new_timeline_id)
     if ghost_path:
+        # The path never changes after the branch, so cache it for the
+        # per-frame ghost window checks.
+        world.timeline_paths[new_timeline_id] = (ghost_path, ghost_path[0][0], ghost_path[-1][0])
         color = TIMELINE_COLORS[new_timeline_id % len(TIMELINE_COLORS)]
         ghost = GhostPlayer(ghost_path, color=color, timeline_id=new_timeline_id)
-        world.entities.append(ghost)
+        world.add_entity(ghost)
         active_timelines[new_timeline_id] += 1
         ghosts_created = True
     return ghosts_created
 
 player = Player(pygame.Vector2(400, 300))
 world.player = player
-world.entities.append(player)
+world.add_entity(player)
 
 # Add timers to the world in a grid
 for x in range(100, 701, 100):
     for y in range(100, 501, 100):
         timer = Timer((x, y))
-        world.entities.append(timer)
+        world.add_entity(timer)
 
 was_rewinding_last_frame = False
 
@@ -207,48 +267,49 @@ while running:
     if keys[pygame.K_a]: move_dir.x -= 1
     if keys[pygame.K_d]: move_dir.x += 1
 
-    if move_dir.length_squared() > 0:
-        move_dir = move_dir.normalize()
+    # Never record moves while rewinding: local_time is running
+    # backwards, so the commands would land in the log (and the
+    # movement path) with decreasing scheduled_times, breaking the
+    # sorted-order assumption behind the binary-searched path lookups
+    # and the cached ghost paths. Input during a rewind is ignored.
+    if move_dir.length_squared() > 0 and not world.rewinding:
         # Calculate where the player should be next frame
         step_size = dt  # Could also use a fixed step, e.g., 0.01
-        velocity = move_dir * player.move_speed
+        scheduled_time = player.local_time + step_size
         # Get current simulated position
         curr_pos = player.movement.get_pos(player.local_time) or player.pos
-        next_pos = curr_pos + velocity * step_size
-        # Add this step to the movement component, at local_time + step_size
-        player.movement.add_step(player.local_time + step_size, next_pos)
+        next_pos = curr_pos + move_dir.normalize() * (player.move_speed * step_size)
+        # Add this step to the movement component, at local_time + step_size.
+        # The path and the command share the same vector; neither side
+        # ever mutates it, so there is no need to copy it every frame.
+        player.movement.add_step(scheduled_time, next_pos)
 
         move_cmd = Command(
             target=world,
             data={
                 "entity_type": "player",
-                "pos": next_pos.copy(),
-                "scheduled_time": player.local_time + step_size,
+                "pos": next_pos,
+                "scheduled_time": scheduled_time,
                 "timeline_id": world.current_timeline_id
             },
             forward_fn=None,   # (You might not need to "execute" anything immediately)
             backward_fn=None,  # (Likewise)
-            scheduled_time=player.local_time + step_size
+            scheduled_time=scheduled_time
         )
         move_cmd.origin_timeline = world.current_timeline_id
         move_cmd.ghosted_timelines = set()
-        move_cmd.type = "player_move"
+        move_cmd.kind = CMD_PLAYER_MOVE
         world.permanent_command_log.append(move_cmd)
+        world.player_move_log.append(move_cmd)
 
-    # Update entities
+    # Update world time, global commands and every entity
     world.update(dt)
 
-    for e in world.entities:
-        e.update(dt, world.global_time, world.rewinding)
-
-    def is_obsolete(entity):
-        # Only remove if the entity hasn't been born yet (not if it's "dead" in local time!)
-        if isinstance(entity, Bullet):
-            return entity.local_time < 0
-        return False  # For other entities, you can keep your old logic
-
+    # Only remove bullets that haven't been born yet (not ones that are
+    # "dead" in local time!)
     if not world.rewinding:
-        world.entities[:] = [e for e in world.entities if not is_obsolete(e)]
+        for b in [b for b in world.bullets if b.local_time < 0]:
+            world.remove_entity(b)
 
     # Prune the player's future path if they just stopped rewinding
     if was_rewinding_last_frame and not world.rewinding and rewind_charges > 0:
@@ -277,7 +338,15 @@ while running:
             world.permanent_command_log = [
                 cmd for cmd in world.permanent_command_log
                 if not (
-                    getattr(cmd, "type", None) == "player_move" and
+                    cmd.kind == CMD_PLAYER_MOVE and
+                    cmd.origin_timeline == world.current_timeline_id and
+                    cmd.scheduled_time > player.local_time
+                )
+            ]
+
+            world.player_move_log = [
+                cmd for cmd in world.player_move_log
+                if not (
                     cmd.origin_timeline == world.current_timeline_id and
                     cmd.scheduled_time > player.local_time
                 )
@@ -304,113 +373,93 @@ while running:
     # At the end, store current rewinding state for next frame
     was_rewinding_last_frame = world.rewinding
 
-    for entity in list(world.entities):
-        if hasattr(entity, "ghost") and entity.ghost:
-            end_time = None
-            if isinstance(entity, GhostBullet):
-                end_time = entity.spawn_time + entity.max_lifetime
-            elif isinstance(entity, GhostPlayer):
-                if entity.movement.path:
-                    end_time = entity.movement.path[-1][0]
-            if end_time is not None and world.global_time > end_time:
-                world.entities.remove(entity)
-                tid = getattr(entity, "timeline_id", None)
-                if tid is not None:
-                    active_timelines[tid] -= 1
-                    if active_timelines[tid] == 0:
-                        rewind_charges = min(rewind_charges + 1, MAX_REWINDS)
-                        del active_timelines[tid]
-
-    for timeline_id in range(world.next_timeline_id):  # or track all timeline_ids you've used
-        # Collect all movement steps for this timeline, in time order
-        path = [
-            (cmd.scheduled_time, cmd.data["pos"].copy())
-            for cmd in world.permanent_command_log
-            if getattr(cmd, "type", None) == "player_move"
-            and timeline_id in getattr(cmd, "ghosted_timelines", set())
-        ]
-        if not path:
-            continue
-        path.sort()  # Ensure correct order
-        start_time, end_time = path[0][0], path[-1][0]
-
+    for entity in world.ghost_bullets + world.ghost_players:
+        end_time = None
+        if entity.kind == KIND_GHOST_BULLET:
+            end_time = entity.spawn_time + entity.max_lifetime
+        elif entity.movement.path:
+            end_time = entity.movement.path[-1][0]
+        if end_time is not None and world.global_time > end_time:
+            world.remove_entity(entity)
+            tid = entity.timeline_id
+            if tid is not None:
+                active_timelines[tid] -= 1
+                if active_timelines[tid] == 0:
+                    rewind_charges = min(rewind_charges + 1, MAX_REWINDS)
+                    del active_timelines[tid]
+
+    for timeline_id, (path, start_time, end_time) in world.timeline_paths.items():
         if start_time <= world.global_time < end_time:
             # Deduplicate: Only one ghost per timeline
-            ghost_present = any(
-                isinstance(e, GhostPlayer) and getattr(e, "timeline_id", None) == timeline_id
-                for e in world.entities
-            )
-            if not ghost_present:
+            if timeline_id not in world.player_ghost_by_tid:
                 color = TIMELINE_COLORS[timeline_id % len(TIMELINE_COLORS)]
                 ghost = GhostPlayer(path, color=color, timeline_id=timeline_id)
-                world.entities.append(ghost)
+                world.add_entity(ghost)
         else:
             # Remove ghosts for this timeline if out of window
-            to_remove = [e for e in world.entities if isinstance(e, GhostPlayer) and getattr(e, "timeline_id", None) == timeline_id]
-            for e in to_remove:
-                world.entities.remove(e)
+            ghost = world.player_ghost_by_tid.get(timeline_id)
+            if ghost is not None:
+                world.remove_entity(ghost)
 
 
-    for cmd in world.permanent_command_log:
-        if not (hasattr(cmd, "forward_fn") and getattr(cmd.forward_fn, "__name__", "") == "shoot_bullet"):
-            continue
+    for cmd in world.bullet_spawn_log:
         for tid in cmd.ghosted_timelines:
             spawn = cmd.scheduled_time
             end = spawn + cmd.data.get("max_lifetime", 2.5)
+            key = (id(cmd), tid)
             if spawn <= world.global_time < end:
                 # Deduplicate by (cmd, tid)
-                ghost_present = any(
-                    getattr(e, "cmd_ref", None) == cmd and getattr(e, "timeline_id", None) == tid
-                    for e in world.entities
-                )
-                if not ghost_present:
+                if key not in world.bullet_ghost_by_key:
                     pos = cmd.data["pos"].copy()
                     velocity = cmd.data["velocity"]
                     color = TIMELINE_COLORS[tid % len(TIMELINE_COLORS)]
                     ghost = GhostBullet(spawn, pos, velocity, world.global_time, cmd.data.get("max_lifetime", 2.5), color=color, timeline_id=tid)
                     ghost.cmd_ref = cmd
-                    world.entities.append(ghost)
+                    world.add_entity(ghost)
             else:
                 # Remove ghost if outside of lifespan
-                to_remove = [e for e in world.entities if getattr(e, "cmd_ref", None) == cmd and getattr(e, "timeline_id", None) == tid]
-                for e in to_remove:
-                    world.entities.remove(e)
+                ghost = world.bullet_ghost_by_key.get(key)
+                if ghost is not None:
+                    world.remove_entity(ghost)
 
 
+    # Sweep out everything removed this frame in one pass per list
+    world.flush_removals()
+
+    frame_count += 1
+    if frame_count % COMPACT_INTERVAL_FRAMES == 0:
+        live_timelines = set(active_timelines)
+        cutoff = world.global_time - HISTORY_WINDOW
+
+        def still_needed(cmd):
+            return cmd.scheduled_time > cutoff or bool(cmd.ghosted_timelines & live_timelines)
+
+        world.permanent_command_log = [c for c in world.permanent_command_log if still_needed(c)]
+        world.player_move_log = [c for c in world.player_move_log if still_needed(c)]
+        world.bullet_spawn_log = [c for c in world.bullet_spawn_log if still_needed(c)]
+
     # Draw
     screen.fill((0, 0, 0))
 
-    # Draw time field heatmap
-    for x in range(0, 800, 10):
-        for y in range(0, 600, 10):
-            factor = get_time_factor(pygame.Vector2(x, y), pygame.Vector2(400, 300), 500)
-            intensity = int(255 * factor)
-            screen.fill((intensity, 0, 0), rect=pygame.Rect(x, y, 10, 10))
-
-    # Draw timers
-    for timer in world.entities:
-        if isinstance(timer, Timer):
-            text = font.render(f"{timer.count:.2f}", True, (255, 255, 255))
-            screen.blit(text, timer.pos + pygame.Vector2(12, -8))
+    # Draw time field heatmap (precomputed, field source never moves)
+    screen.blit(heatmap_surf, (0, 0))
 
+    # One walk over the entity list, dispatching on kind
     for entity in world.entities:
-        if hasattr(entity, "ghost") and entity.ghost:
-            spawn_time = getattr(entity, "spawn_time", None)
-            if spawn_time is not None and world.global_time < spawn_time:
-                continue
-            color = getattr(entity, "color", (220, 220, 220))
-            if isinstance(entity, GhostBullet):
-                pygame.draw.circle(screen, color, (int(entity.pos.x), int(entity.pos.y)), 7, 3)
-                pygame.draw.circle(screen, (255,255,255), (int(entity.pos.x), int(entity.pos.y)), 3)
-            elif isinstance(entity, GhostPlayer):
-                pygame.draw.circle(screen, color, (int(entity.pos.x), int(entity.pos.y)), 16, 4)
-            continue
-
-        # Normal rendering for non-ghosts
-        if isinstance(entity, Bullet):
-            pygame.draw.circle(screen, entity.color, (int(entity.pos.x), int(entity.pos.y)), 5)
-        elif isinstance(entity, Player):
-            pygame.draw.circle(screen, entity.color, (int(entity.pos.x), int(entity.pos.y)), 14)
+        k = entity.kind
+        if k == KIND_TIMER:
+            text = font.render(f"{entity.count:.2f}", True, (255, 255, 255))
+            screen.blit(text, entity.label_pos)
+        elif k == KIND_GHOST_BULLET:
+            if world.global_time >= entity.spawn_time:
+                pygame.draw.circle(screen, entity.color, entity.draw_pos, 7, 3)
+                pygame.draw.circle(screen, (255,255,255), entity.draw_pos, 3)
+        elif k == KIND_GHOST_PLAYER:
+            pygame.draw.circle(screen, entity.color, entity.draw_pos, 16, 4)
+        elif k == KIND_BULLET:
+            pygame.draw.circle(screen, entity.color, entity.draw_pos, 5)
+        elif k == KIND_PLAYER:
+            pygame.draw.circle(screen, entity.color, entity.draw_pos, 14)
         # etc...
 
             
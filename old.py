@@ -1,6 +1,16 @@
+import bisect
+import heapq
+import logging
 import pygame
 import math
 import random
+import numpy as np
+
+# Rewind tracing used to go through print(), which blocks on console
+# I/O in the middle of the frame. Keep it behind the debug level so it
+# costs nothing unless someone turns it on.
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
 
 pygame.init()
 screen = pygame.display.set_mode((1000, 600))
@@ -24,45 +34,137 @@ show_overlay = True
 overlay_ripple = 0.0
 overlay_ripple_decay = 3.0
 
-def get_time_factor(pos, time_center, max_radius):
-    dist = (pygame.Vector2(pos) - time_center).length()
-    t = min(dist / max_radius, 1.0)
-    return max(0.001, 1.0 - t**2)
+# 1D time-factor LUT keyed by squared distance. tf = 1 - (d/R)^2 is a
+# smooth function of d^2, so one multiply + index replaces the Vector2
+# construction, sqrt and pow per call. Assumes the fixed MAX_RADIUS
+# field; rebuild the table if the radius ever becomes dynamic.
+TF_LUT_SIZE = 2048
+_TF_LUT = [max(0.001, 1.0 - i / TF_LUT_SIZE) for i in range(TF_LUT_SIZE + 1)]
+_TF_LUT_SCALE = TF_LUT_SIZE / (MAX_RADIUS * MAX_RADIUS)
+_INV_MAX_R2 = 1.0 / (MAX_RADIUS * MAX_RADIUS)
+
+def get_time_factor(px, py, tcx, tcy, max_radius):
+    # Plain-float signature: callers pass components so the hot path
+    # never touches Vector2 indexing or builds temporaries
+    dx = px - tcx
+    dy = py - tcy
+    i = int((dx * dx + dy * dy) * _TF_LUT_SCALE)
+    if i > TF_LUT_SIZE:
+        i = TF_LUT_SIZE
+    return _TF_LUT[i]
+
+def advance_bullets(px, py, sx, sy, vx, vy, age, local_time, dt, cx, cy, rewinding):
+    # Whole-array bullet step: time factor, local time, age and the
+    # closed-form positions in a handful of vector ops. Kept as a free
+    # function of plain arrays so it could be jitted wholesale if this
+    # ever needs to go faster.
+    d2 = (px - cx) ** 2 + (py - cy) ** 2
+    tf = np.maximum(0.001, 1.0 - np.minimum(d2 * _INV_MAX_R2, 1.0))
+    local_dt = tf * (-dt if rewinding else dt)
+    local_time += local_dt
+    np.maximum(local_time, 0.0, out=local_time)
+    age += local_dt
+    px[:] = sx + vx * local_time
+    py[:] = sy + vy * local_time
 
 class Command:
-    def __init__(self, target, data, forward_fn, backward_fn, scheduled_time):
+    # Slotted and flat: the prev/new positions live as four floats on
+    # the command itself instead of a dict holding two Vector2s. The
+    # base command IS the move command -- execute/reverse apply the
+    # stored positions directly, and the spawn/shoot variants subclass
+    # with their own bodies, so there is no per-call dispatch through
+    # stored function references or op tags. With hundreds of commands
+    # alive at once this is most of their RSS.
+    __slots__ = ('target', 'prev_x', 'prev_y', 'new_x', 'new_y',
+                 'scheduled_time', 'executed', 'discarded')
+
+    def __init__(self, target, prev_pos, new_pos, scheduled_time):
         self.target = target
-        self.data = data
-        self.forward_fn = forward_fn
-        self.backward_fn = backward_fn
+        self.prev_x, self.prev_y = prev_pos[0], prev_pos[1]
+        self.new_x, self.new_y = new_pos[0], new_pos[1]
         self.scheduled_time = scheduled_time
         self.executed = False
+        self.discarded = False  # tombstone; dropped when it surfaces in the pending heap
 
     def execute(self):
         if not self.executed:
-            self.forward_fn(self.data, self.target)
+            # Mutate the existing vector rather than binding a fresh
+            # one; replaying a long queue allocates nothing this way
+            self.target.pos.update(self.new_x, self.new_y)
             self.executed = True
 
     def reverse(self):
         if self.executed:
-            self.backward_fn(self.data, self.target)
+            self.target.pos.update(self.prev_x, self.prev_y)
             self.executed = False  # ← This is crucial!
 
 
+# One pre-rendered ghost circle shared by every draw_ghosts call; only
+# its alpha changes per blit
+GHOST_TMPL = pygame.Surface((16, 16), pygame.SRCALPHA)
+pygame.draw.circle(GHOST_TMPL, (150, 150, 150, 255), (8, 8), 6)
+
+# Spacing (in bullet-local seconds) between samples of a bullet's
+# future path when previewing it as ghosts
+GHOST_PREVIEW_STEP = 0.5
+
+# Batched drawing: entities and ghosts append (template, dest) pairs to
+# a frame-local list and the main loop submits them in one
+# Surface.blits call instead of a draw.circle / blit per object.
+# Templates are cached per color (sprites) and per quantized alpha
+# (ghosts), so only a handful of small surfaces ever exist.
+_SPRITE_TMPLS = {}
+
+def _sprite_tmpl(color):
+    tmpl = _SPRITE_TMPLS.get(color)
+    if tmpl is None:
+        tmpl = pygame.Surface((16, 16), pygame.SRCALPHA)
+        pygame.draw.circle(tmpl, color, (8, 8), 8)
+        _SPRITE_TMPLS[color] = tmpl
+    return tmpl
+
+_GHOST_TMPLS = {}
+
+def _ghost_tmpl(alpha):
+    # Quantize to 32-wide buckets; the fade is too gradual to notice
+    # and it keeps the number of template copies tiny
+    bucket = alpha // 32
+    tmpl = _GHOST_TMPLS.get(bucket)
+    if tmpl is None:
+        tmpl = GHOST_TMPL.copy()
+        tmpl.set_alpha(bucket * 32 + 16)
+        _GHOST_TMPLS[bucket] = tmpl
+    return tmpl
+
+# Timer labels only ever show one decimal, so the same strings come up
+# over and over; cache the rendered surfaces instead of re-rasterizing
+# every timer every frame. Bounded so a long session can't grow it
+# without limit.
+_TIMER_TEXT_CACHE = {}
+_TIMER_TEXT_CACHE_MAX = 1024
+
+def _timer_text(font, time_str):
+    text = _TIMER_TEXT_CACHE.get(time_str)
+    if text is None:
+        if len(_TIMER_TEXT_CACHE) >= _TIMER_TEXT_CACHE_MAX:
+            _TIMER_TEXT_CACHE.clear()
+        text = font.render(time_str, True, WHITE)
+        _TIMER_TEXT_CACHE[time_str] = text
+    return text
+
 class SpatialTimer:
     def __init__(self, pos):
         self.pos = pygame.Vector2(pos)
         self.local_time = 0.0
 
     def update(self, dt, rewinding):
-        tf = get_time_factor(self.pos, time_center, MAX_RADIUS)
+        tf = get_time_factor(self.pos.x, self.pos.y, time_center.x, time_center.y, MAX_RADIUS)
         delta = -dt if rewinding else dt
         self.local_time = max(0.0, self.local_time + delta * tf)
 
     def draw(self, surface, font):
         # Format time to 1 decimal place
-        time_str = f"{self.local_time:.1f}s"
-        text = font.render(time_str, True, WHITE)
+        text = _timer_text(font, f"{self.local_time:.1f}s")
         text_rect = text.get_rect(center=self.pos)
         surface.blit(text, text_rect)
 
@@ -74,45 +176,55 @@ class TimeEntity:
         self.pos = pygame.Vector2(pos)
         self.local_time = 0.0
         self.command_queue = []
+        self._sched_times = []  # parallel scheduled_time column for bisect
+        # Shoot commands fire on this entity's local time, so they get
+        # their own pending heap and undo stack here rather than in the
+        # world's global-time structures. Empty for anything that never
+        # shoots.
+        self.shoot_pending = []  # (scheduled_time, seq, cmd) heap
+        self.shoot_executed = []
         self.command_index = 0
         self.color = color
 
     def update(self, dt, global_time, rewinding=False):
         # Compute time factor and adjust local time
-        tf = get_time_factor(self.pos, time_center, MAX_RADIUS)
+        tf = get_time_factor(self.pos.x, self.pos.y, time_center.x, time_center.y, MAX_RADIUS)
         delta = -dt if rewinding else dt
         self.local_time = max(0.0, self.local_time + delta * tf)
 
-        # Execute forward in time
-        while self.command_index < len(self.command_queue):
-            cmd = self.command_queue[self.command_index]
-            if self.local_time >= cmd.scheduled_time:
-                cmd.execute()
-                self.command_index += 1
-            else:
-                break
-
-        # Reverse if rewinding
-        while self.command_index > 0:
-            prev_cmd = self.command_queue[self.command_index - 1]
-            if self.local_time < prev_cmd.scheduled_time:
-                prev_cmd.reverse()
-                self.command_index -= 1
-            else:
-                break
-
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, self.pos, 8)
-
-    def draw_ghosts(self, surface, global_time):
+        self.process_commands(rewinding)
+
+    def queue_command(self, cmd):
+        self.command_queue.append(cmd)
+        self._sched_times.append(cmd.scheduled_time)
+
+    def process_commands(self, rewinding):
+        if len(self._sched_times) != len(self.command_queue):
+            # Queue was mutated behind our back (e.g. cleared); resync
+            self._sched_times = [c.scheduled_time for c in self.command_queue]
+
+        # The queue is sorted by scheduled_time, so the new index is a
+        # binary search away even after a large rewind or time jump
+        target = bisect.bisect_right(self._sched_times, self.local_time)
+        if target > self.command_index:
+            # Execute forward in time
+            for i in range(self.command_index, target):
+                self.command_queue[i].execute()
+        elif target < self.command_index:
+            # Reverse if rewinding
+            for i in range(self.command_index - 1, target - 1, -1):
+                self.command_queue[i].reverse()
+        self.command_index = target
+
+    def draw(self, blits):
+        blits.append((_sprite_tmpl(self.color), (self.pos.x - 8, self.pos.y - 8)))
+
+    def draw_ghosts(self, blits, global_time):
         for cmd in self.command_queue:
             if not cmd.executed:
-                pos = cmd.data['new_pos']
-                ghost = pygame.Surface((16, 16), pygame.SRCALPHA)
                 age = max(0.01, cmd.scheduled_time - self.local_time)
                 alpha = max(20, min(180, int(255 * (1.0 - age / 5.0))))
-                pygame.draw.circle(ghost, (150, 150, 150, alpha), (8, 8), 6)
-                surface.blit(ghost, (pos.x - 8, pos.y - 8))
+                blits.append((_ghost_tmpl(alpha), (cmd.new_x - 8, cmd.new_y - 8)))
 
 class Bullet(TimeEntity):
     def __init__(self, pos, velocity, color=(0, 200, 255)):
@@ -121,43 +233,36 @@ class Bullet(TimeEntity):
         self.dead = False
         self.age = 0.0
         self.max_age = 3.0  # seconds
+        self.index = -1  # slot in the world's SoA bullet arrays
 
     def update(self, dt, global_time, rewinding=False):
-        super().update(dt, global_time, rewinding)
-
-        # Calculate how fast this bullet experiences time
-        time_factor = get_time_factor(self.pos, time_center, MAX_RADIUS)
-        local_dt = dt * time_factor
-
+        # Straight-line motion is analytic: pos = initial_pos +
+        # velocity * local_time, with local_time already integrating the
+        # time factor. GameWorld.update's SoA pass evaluates it for all
+        # bullets at once, so there is no command queue to replay and
+        # rewinding is reversible for free. Only the lifetime flag is
+        # left to maintain here.
         if rewinding:
-            self.age -= local_dt
             if self.age < self.max_age:
                 self.dead = False  # Revive if rewinding brings it back before expiration
         else:
-            self.age += local_dt
             if self.age > self.max_age:
                 self.dead = True
 
-        MAX_COMMANDS = 200
-        if len(self.command_queue) > MAX_COMMANDS:
-            self.command_queue.pop(0)
-            self.command_index = max(0, self.command_index - 1)
-
-        if not self.dead and len(self.command_queue) - self.command_index < 5:
-            prev = self.pos.copy()
-            for i in range(5):
-                t = self.local_time + i * 0.05
-                new = prev + self.velocity * 0.05
-
-                cmd = Command(
-                    target=self,
-                    data={"prev_pos": prev, "new_pos": new},
-                    forward_fn=move_forward,
-                    backward_fn=move_backward,
-                    scheduled_time=t
-                )
-                self.command_queue.append(cmd)
-                prev = new
+    def draw_ghosts(self, blits, global_time):
+        # The future path is closed-form now, so the ghost preview
+        # samples pos = initial_pos + velocity * t directly instead of
+        # walking queued move commands
+        t = self.local_time + GHOST_PREVIEW_STEP
+        while t < self.max_age:
+            age = max(0.01, t - self.local_time)
+            alpha = max(20, min(180, int(255 * (1.0 - age / 5.0))))
+            blits.append((
+                _ghost_tmpl(alpha),
+                (self.initial_pos.x + self.velocity.x * t - 8,
+                 self.initial_pos.y + self.velocity.y * t - 8),
+            ))
+            t += GHOST_PREVIEW_STEP
 
 class SpawnBulletCommand(Command):
     def __init__(self, world, bullet_data, scheduled_time):
@@ -165,25 +270,22 @@ class SpawnBulletCommand(Command):
         self.bullet_data = bullet_data
         self.scheduled_time = scheduled_time
         self.executed = False
+        self.discarded = False
         self.bullet = None
 
     def execute(self):
         if not self.executed:
             bullet = Bullet(self.bullet_data["pos"], self.bullet_data["velocity"], self.bullet_data["color"])
             self.bullet = bullet
-            self.world.bullets.append(bullet)
-            if hasattr(self.world, "time_entities"):
-                self.world.time_entities.append(bullet)  # ← make sure to track bullets here too
+            self.world.add_bullet(bullet)
             self.executed = True
 
     def reverse(self):
-        print(f"Reversing bullet spawn at t={self.scheduled_time}")
+        logger.debug("Reversing bullet spawn at t=%s", self.scheduled_time)
         if self.executed and self.bullet in self.world.bullets:
-            self.world.bullets.remove(self.bullet)
-            if hasattr(self.world, "time_entities") and self.bullet in self.world.time_entities:
-                self.world.time_entities.remove(self.bullet)
-            self.bullet.command_queue.clear()
+            self.world.remove_bullet(self.bullet)
             self.bullet.dead = True
+            self.world.bullets_dirty = True
             self.executed = False
 
 class BuddyShootCommand(Command):
@@ -193,8 +295,8 @@ class BuddyShootCommand(Command):
         self.spawn_cmd = None
         self.scheduled_time = scheduled_time
         self.executed = False
+        self.discarded = False
         self.target = buddy
-        self.data = {}
 
         # Freeze all randomness now to ensure determinism
         angle = random.uniform(0, 2 * math.pi)
@@ -212,69 +314,95 @@ class BuddyShootCommand(Command):
         if not self.executed and self.buddy in self.world.buddies:
             spawn_time = self.scheduled_time + 0.01
             self.spawn_cmd = SpawnBulletCommand(self.world, self.bullet_data, spawn_time)
-            self.world.global_commands.append(self.spawn_cmd)
+            self.world.schedule_command(self.spawn_cmd)
             self.executed = True
 
     def reverse(self):
-        print(f"Reverse BuddyShootCommand at t={self.scheduled_time}")
+        logger.debug("Reverse BuddyShootCommand at t=%s", self.scheduled_time)
         if self.spawn_cmd:
             self.spawn_cmd.reverse()
-            if self.spawn_cmd in self.world.global_commands:
-                self.world.global_commands.remove(self.spawn_cmd)
+            # Tombstone instead of list.remove; the pending heap drops
+            # these when they surface
+            self.spawn_cmd.discarded = True
         self.executed = False
 
 def make_movement_command(entity, offset, scheduled_time):
     prev = entity.logical_pos.copy()
     new = prev + offset
-    entity.logical_pos = new.copy()  # ← Update logical position now
-    return Command(entity, {'prev_pos': prev, 'new_pos': new}, move_forward, move_backward, scheduled_time)
-
-def move_forward(data, entity):
-    entity.pos = data['new_pos']
-
-def move_backward(data, entity):
-    entity.pos = data['prev_pos']
+    entity.logical_pos = new  # ← Update logical position now
+    return Command(entity, prev, new, scheduled_time)
+
+OVERLAY_GRID_SIZE = 30
+# Cell centres for the whole overlay grid, computed once (the screen
+# never resizes)
+_OVERLAY_CX, _OVERLAY_CY = np.meshgrid(
+    np.arange(0, 1000, OVERLAY_GRID_SIZE, dtype=np.float64) + OVERLAY_GRID_SIZE / 2,
+    np.arange(0, 600, OVERLAY_GRID_SIZE, dtype=np.float64) + OVERLAY_GRID_SIZE / 2,
+    indexing="ij",
+)
+
+# The overlay only changes when the time centre moves or a ripple is
+# playing, which is rare — cache the rendered surface between frames
+_overlay_cache = None
+_overlay_cache_key = None
 
 def draw_time_gradient_overlay(surface, time_center, max_radius, ripple_strength=0.0):
-    overlay = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-    width, height = surface.get_size()
-    grid_size = 30
-
-    for y in range(0, height, grid_size):
-        for x in range(0, width, grid_size):
-            pos = pygame.Vector2(x + grid_size / 2, y + grid_size / 2)
-            tf = get_time_factor(pos, time_center, max_radius)
-
-            # Color hue from blue (fast) to red (slow)
-            hue = int((1 - tf) * 255)
-            color = (hue, int(tf * 255), 255 - hue)
-
-            # Add ripple alpha effect
-            dist = (pos - time_center).length()
-            ripple_alpha = int(30 + 50 * math.sin(dist * 0.05 - ripple_strength * 5)) if ripple_strength > 0 else 40
-
-            r = max(0, min(255, int(color[0])))
-            g = max(0, min(255, int(color[1])))
-            b = max(0, min(255, int(color[2])))
-            a = max(0, min(255, int(ripple_alpha)))
-
-            pygame.draw.rect(
-                overlay,
-                (r, g, b, a),
-                (x, y, grid_size, grid_size)
-            )
-
-            # Draw flow direction vector
-            flow_length = tf * 8
-            direction = (pos - time_center).normalize() * flow_length
-            flow_start = pos
-            flow_end = pos + direction
-            flow_color = (255, 255, 255, int(80 + tf * 100))  # brighter near center
-
-            pygame.draw.line(overlay, flow_color, flow_start, flow_end, 2)
-
-
-    surface.blit(overlay, (0, 0))
+    global _overlay_cache, _overlay_cache_key
+    key = (time_center.x, time_center.y, ripple_strength)
+    if _overlay_cache is None or key != _overlay_cache_key:
+        _overlay_cache = _render_overlay(time_center, max_radius, ripple_strength)
+        _overlay_cache_key = key
+    surface.blit(_overlay_cache, (0, 0))
+
+def _render_overlay(time_center, max_radius, ripple_strength):
+    # One vectorized pass over every cell instead of ~667 Python
+    # iterations of get_time_factor + draw.rect
+    dx = _OVERLAY_CX - time_center.x
+    dy = _OVERLAY_CY - time_center.y
+    d2 = dx * dx + dy * dy
+    # 1 - t^2 == 1 - d^2/R^2, so the time factor needs no sqrt at all;
+    # the root is only taken once, for the ripple phase and the flow
+    # vector normalization below
+    tf = np.maximum(0.001, 1.0 - np.minimum(d2 * _INV_MAX_R2, 1.0))
+    dist = np.sqrt(d2)
+
+    # Color hue from blue (fast) to red (slow)
+    hue = ((1.0 - tf) * 255).astype(np.uint8)
+    # Add ripple alpha effect
+    if ripple_strength > 0:
+        alpha = 30 + 50 * np.sin(dist * 0.05 - ripple_strength * 5)
+    else:
+        alpha = np.full(dist.shape, 40.0)
+
+    cells = pygame.Surface(_OVERLAY_CX.shape, pygame.SRCALPHA)
+    rgb = pygame.surfarray.pixels3d(cells)
+    rgb[..., 0] = hue
+    rgb[..., 1] = (tf * 255).astype(np.uint8)
+    rgb[..., 2] = 255 - hue
+    cell_alpha = pygame.surfarray.pixels_alpha(cells)
+    cell_alpha[:] = np.clip(alpha, 0, 255).astype(np.uint8)
+    del rgb, cell_alpha  # release the surface locks before scaling
+    overlay = pygame.transform.scale(
+        cells,
+        (cells.get_width() * OVERLAY_GRID_SIZE, cells.get_height() * OVERLAY_GRID_SIZE),
+    )
+
+    # Flow direction vectors: endpoints computed as arrays, one draw
+    # call per line left over. Below tf 0.05 a line is a sub-pixel
+    # stub nobody can see, so mask those cells out before the loop --
+    # in practice that culls everything outside the field radius.
+    visible = tf >= 0.05
+    tfv = tf[visible]
+    scale = tfv * 8 / (dist[visible] + 1e-9)
+    sx = _OVERLAY_CX[visible]
+    sy = _OVERLAY_CY[visible]
+    ex = sx + dx[visible] * scale
+    ey = sy + dy[visible] * scale
+    fa = (80 + tfv * 100).astype(np.int32)  # brighter near center
+    for i in range(sx.size):
+        pygame.draw.line(overlay, (255, 255, 255, int(fa[i])), (sx[i], sy[i]), (ex[i], ey[i]), 2)
+
+    return overlay
 
 NUM_BUDDIES = 5
 buddies = []
@@ -289,41 +417,149 @@ class GameWorld:
     def __init__(self):
         self.buddies = []
         self.bullets = []
-        self.global_commands = []
+        # Global-time commands live in a min-heap on scheduled_time plus
+        # a max-heap of executed commands, also on scheduled_time, so
+        # each frame only touches the commands that actually cross the
+        # time cursor. Execution order is NOT reversal order here: spawn
+        # commands are scheduled on their buddy's local clock and can
+        # execute after global time has passed their scheduled_time, so
+        # a plain undo stack would not be monotonic and a rewind could
+        # stall on a late-executed early command. Buddy shoot commands
+        # get the pending-heap treatment per buddy (see TimeEntity's
+        # shoot_pending / shoot_executed).
+        self.pending = []  # (scheduled_time, seq, cmd) min-heap
+        self.executed = []  # (-scheduled_time, seq, cmd) max-heap
+        self._cmd_seq = 0
+        # Set whenever a bullet dies so the compaction sweep only runs
+        # on frames that actually have something to remove
+        self.bullets_dirty = False
         self.last_global_time = 0.0
+        # SoA mirrors of bullet kinematic state (structure of arrays),
+        # advanced for every bullet in one vectorized pass per frame.
+        # The Bullet objects stay as thin proxies via their .index slot.
+        self._bullet_capacity = 1024
+        self.bullet_px = np.zeros(self._bullet_capacity)
+        self.bullet_py = np.zeros(self._bullet_capacity)
+        self.bullet_sx = np.zeros(self._bullet_capacity)
+        self.bullet_sy = np.zeros(self._bullet_capacity)
+        self.bullet_vx = np.zeros(self._bullet_capacity)
+        self.bullet_vy = np.zeros(self._bullet_capacity)
+        self.bullet_age = np.zeros(self._bullet_capacity)
+        self.bullet_local_time = np.zeros(self._bullet_capacity)
+
+    def schedule_command(self, cmd):
+        if isinstance(cmd, BuddyShootCommand):
+            heapq.heappush(cmd.buddy.shoot_pending, (cmd.scheduled_time, self._cmd_seq, cmd))
+        else:
+            heapq.heappush(self.pending, (cmd.scheduled_time, self._cmd_seq, cmd))
+        self._cmd_seq += 1
+
+    def add_bullet(self, bullet):
+        i = len(self.bullets)
+        if i >= self._bullet_capacity:
+            self._bullet_capacity *= 2
+            self.bullet_px = np.resize(self.bullet_px, self._bullet_capacity)
+            self.bullet_py = np.resize(self.bullet_py, self._bullet_capacity)
+            self.bullet_sx = np.resize(self.bullet_sx, self._bullet_capacity)
+            self.bullet_sy = np.resize(self.bullet_sy, self._bullet_capacity)
+            self.bullet_vx = np.resize(self.bullet_vx, self._bullet_capacity)
+            self.bullet_vy = np.resize(self.bullet_vy, self._bullet_capacity)
+            self.bullet_age = np.resize(self.bullet_age, self._bullet_capacity)
+            self.bullet_local_time = np.resize(self.bullet_local_time, self._bullet_capacity)
+        bullet.index = i
+        self.bullets.append(bullet)
+        self.bullet_px[i] = bullet.pos.x
+        self.bullet_py[i] = bullet.pos.y
+        self.bullet_sx[i] = bullet.initial_pos.x
+        self.bullet_sy[i] = bullet.initial_pos.y
+        self.bullet_vx[i] = bullet.velocity.x
+        self.bullet_vy[i] = bullet.velocity.y
+        self.bullet_age[i] = bullet.age
+        self.bullet_local_time[i] = bullet.local_time
+
+    def remove_bullet(self, bullet):
+        # Swap the last bullet into the freed slot so removal is O(1)
+        i = bullet.index
+        last = len(self.bullets) - 1
+        if i != last:
+            moved = self.bullets[last]
+            self.bullets[i] = moved
+            moved.index = i
+            for arr in (self.bullet_px, self.bullet_py, self.bullet_sx,
+                        self.bullet_sy, self.bullet_vx, self.bullet_vy,
+                        self.bullet_age, self.bullet_local_time):
+                arr[i] = arr[last]
+        self.bullets.pop()
+        bullet.index = -1
 
     def update(self, dt, global_time, rewinding):
         for entity in self.buddies:
             entity.update(dt, global_time, rewinding)
 
-        for bullet in self.bullets:
-            bullet.update(dt, global_time, rewinding)
+        n = len(self.bullets)
+        if n:
+            px = self.bullet_px[:n]
+            py = self.bullet_py[:n]
+            lt = self.bullet_local_time[:n]
+            age = self.bullet_age[:n]
+            advance_bullets(
+                px, py, self.bullet_sx[:n], self.bullet_sy[:n],
+                self.bullet_vx[:n], self.bullet_vy[:n], age, lt,
+                dt, time_center.x, time_center.y, rewinding,
+            )
 
-        self.bullets[:] = [b for b in self.bullets if not b.dead]
+            for i, bullet in enumerate(self.bullets):
+                bullet.local_time = lt[i]
+                bullet.age = age[i]
+                bullet.pos.update(px[i], py[i])
+                bullet.update(dt, global_time, rewinding)
+                if bullet.dead:
+                    self.bullets_dirty = True
 
-        forward_progress = not rewinding and global_time > self.last_global_time
+        if self.bullets_dirty:
+            for b in [b for b in self.bullets if b.dead]:
+                self.remove_bullet(b)
+            self.bullets_dirty = False
 
-        for cmd in self.global_commands:
-            if isinstance(cmd, Command):
-                if rewinding:
-                    if not cmd.executed:
-                        print(f"Skipping: {cmd} — not executed yet")
-                    elif global_time >= cmd.scheduled_time:
-                        print(f"Skipping: {cmd} — global time too high ({global_time:.2f} >= {cmd.scheduled_time:.2f})")
-                    else:
-                        print(f"Should reverse: {cmd}")
-                        cmd.reverse()
-                else:
-                    # For BuddyShootCommand, compare using buddy's local_time
-                    if not cmd.executed:
-                        time_check = cmd.scheduled_time
-                        if isinstance(cmd, BuddyShootCommand):
-                            if cmd.buddy.local_time >= time_check and forward_progress:
-                                cmd.execute()
-                        else:
-                            if global_time >= time_check and forward_progress:
-                                cmd.execute()
+        forward_progress = not rewinding and global_time > self.last_global_time
 
+        if rewinding:
+            # Popping by largest scheduled_time reverses every executed
+            # command the cursor has passed, regardless of the order
+            # they happened to execute in
+            while self.executed and global_time < -self.executed[0][0]:
+                cmd = heapq.heappop(self.executed)[2]
+                cmd.reverse()
+                if not cmd.discarded:
+                    heapq.heappush(self.pending, (cmd.scheduled_time, self._cmd_seq, cmd))
+                    self._cmd_seq += 1
+        elif forward_progress:
+            while self.pending and self.pending[0][0] <= global_time:
+                cmd = heapq.heappop(self.pending)[2]
+                if cmd.discarded:
+                    continue  # tombstones fall out of the heap here
+                cmd.execute()
+                heapq.heappush(self.executed, (-cmd.scheduled_time, self._cmd_seq, cmd))
+                self._cmd_seq += 1
+
+        # Buddy shoot commands compare against their buddy's local_time;
+        # each buddy pops its own heap, so a frame only touches the
+        # commands that actually come due instead of rescanning them all
+        for buddy in self.buddies:
+            if rewinding:
+                while buddy.shoot_executed and global_time < buddy.shoot_executed[-1].scheduled_time:
+                    cmd = buddy.shoot_executed.pop()
+                    cmd.reverse()
+                    if not cmd.discarded:
+                        heapq.heappush(buddy.shoot_pending, (cmd.scheduled_time, self._cmd_seq, cmd))
+                        self._cmd_seq += 1
+            elif forward_progress:
+                while buddy.shoot_pending and buddy.shoot_pending[0][0] <= buddy.local_time:
+                    cmd = heapq.heappop(buddy.shoot_pending)[2]
+                    if cmd.discarded:
+                        continue
+                    cmd.execute()
+                    buddy.shoot_executed.append(cmd)
 
         self.last_global_time = global_time
 
@@ -340,7 +576,7 @@ def schedule_buddy_shooting(world, duration=30.0, interval=0.5):
         t = 0.0
         while t < duration:
             shoot_cmd = BuddyShootCommand(world, buddy, scheduled_time=t)
-            world.global_commands.append(shoot_cmd)
+            world.schedule_command(shoot_cmd)
             t += interval
 
 world = GameWorld()
@@ -349,7 +585,7 @@ schedule_buddy_shooting(world, duration=30.0, interval=0.75)
 
 def schedule_bullet_shot(buddy, start_time):
     cmd = BuddyShootCommand(world, buddy, scheduled_time=start_time)
-    world.global_commands.append(cmd)
+    world.schedule_command(cmd)
 
 font = pygame.font.SysFont("consolas", 16)
 timers = []
@@ -413,13 +649,16 @@ while running:
 
     pygame.draw.circle(screen, (40, 40, 80), time_center, MAX_RADIUS, 2)
 
+    frame_blits = []
     for entity in world.buddies:
-        entity.draw_ghosts(screen, global_time)
-        entity.draw(screen)
+        entity.draw_ghosts(frame_blits, global_time)
+        entity.draw(frame_blits)
 
     for bullet in world.bullets:
-        bullet.draw_ghosts(screen, global_time)
-        bullet.draw(screen)
+        bullet.draw_ghosts(frame_blits, global_time)
+        bullet.draw(frame_blits)
+    if frame_blits:
+        screen.blits(frame_blits, doreturn=False)
 
 
     pygame.display.flip()
@@ -2,20 +2,68 @@ import pygame
 import math
 import random
 
+import numpy as np
+
+# Cheap per-entity type tags so hot loops can branch on an int instead
+# of isinstance/hasattr chains. Ghost kinds sort last, so
+# `kind >= KIND_GHOST_BULLET` means "is a ghost".
+KIND_ENTITY = 0
+KIND_TIMER = 1
+KIND_PLAYER = 2
+KIND_BULLET = 3
+KIND_GHOST_BULLET = 4
+KIND_GHOST_PLAYER = 5
+
+# Command kind tags, same idea as the entity kinds: tag once at
+# construction, compare ints in the scans.
+CMD_NONE = 0
+CMD_SHOOT = 1
+CMD_PLAYER_MOVE = 2
+
+# The field source and radius are fixed for the whole prototype
+TIME_CENTER_X = 400.0
+TIME_CENTER_Y = 300.0
+TIME_MAX_RADIUS = 500.0
+
 def get_time_factor(pos, time_center, max_radius, exponent=2.3):
     dist = (pos - time_center).length()
     t = min(dist / max_radius, 1.0)
     return (1.0 - t) ** exponent
 
+def time_factor_at(x, y):
+    # Scalar fast path for the per-entity update loop: same formula as
+    # get_time_factor against the fixed field, without building Vector2s
+    dx = x - TIME_CENTER_X
+    dy = y - TIME_CENTER_Y
+    t = min(math.sqrt(dx * dx + dy * dy) / TIME_MAX_RADIUS, 1.0)
+    return (1.0 - t) ** 2.3
+
 class GameWorld:
     def __init__(self):
-        self.timers = []
         self.entities = []
+        # Per-kind buckets kept in sync with entities, so loops that
+        # only care about one subtype don't scan the whole list.
+        self.timers = []
+        self.bullets = []
+        self.ghost_bullets = []
+        self.ghost_players = []
+        # O(1) ghost presence lookups: bullet ghosts keyed by the spawn
+        # command + timeline, player ghosts by timeline.
+        self.bullet_ghost_by_key = {}
+        self.player_ghost_by_tid = {}
+        # Player ghost paths are immutable once a timeline has branched:
+        # timeline_id -> (path, start_time, end_time), filled at branch time.
+        self.timeline_paths = {}
+        self._removed_ids = set()
         self.global_commands = []
         self.last_global_time = 0.0
         self.global_time = 0.0
         self.rewinding = False
         self.permanent_command_log = []
+        # Per-type views of the permanent log so the frame loops only
+        # scan the commands they care about.
+        self.player_move_log = []
+        self.bullet_spawn_log = []
         self.current_timeline_id = 0
         self.next_timeline_id = 1 
         
@@ -31,9 +79,6 @@ class GameWorld:
 
         forward_progress = not self.rewinding and self.global_time > self.last_global_time
 
-        for timer in self.timers:
-            timer.update(dt, self.global_time, self.rewinding)
-
         # Global commands (if any in future)
         for cmd in self.global_commands:
             if isinstance(cmd, Command):
@@ -42,8 +87,53 @@ class GameWorld:
                 elif forward_progress and not cmd.executed and self.global_time >= cmd.scheduled_time:
                     cmd.execute()
 
+        # Step every entity in one place so the dispatch loop lives next
+        # to the rest of the per-frame world bookkeeping
+        for e in self.entities:
+            e.update(dt, self.global_time, self.rewinding)
+
         self.last_global_time = self.global_time
 
+    def _bucket_for(self, entity):
+        if entity.kind == KIND_TIMER:
+            return self.timers
+        if entity.kind == KIND_BULLET:
+            return self.bullets
+        if entity.kind == KIND_GHOST_BULLET:
+            return self.ghost_bullets
+        if entity.kind == KIND_GHOST_PLAYER:
+            return self.ghost_players
+        return None
+
+    def add_entity(self, entity):
+        self.entities.append(entity)
+        bucket = self._bucket_for(entity)
+        if bucket is not None:
+            bucket.append(entity)
+        if entity.kind == KIND_GHOST_PLAYER:
+            self.player_ghost_by_tid[entity.timeline_id] = entity
+        elif entity.kind == KIND_GHOST_BULLET and entity.cmd_ref is not None:
+            self.bullet_ghost_by_key[(id(entity.cmd_ref), entity.timeline_id)] = entity
+
+    def remove_entity(self, entity):
+        # list.remove is an O(n) equality scan, so just mark the entity
+        # and sweep the lists once per frame in flush_removals. The
+        # ghost dicts are popped immediately so dedup checks stay right.
+        self._removed_ids.add(id(entity))
+        if entity.kind == KIND_GHOST_PLAYER:
+            self.player_ghost_by_tid.pop(entity.timeline_id, None)
+        elif entity.kind == KIND_GHOST_BULLET and entity.cmd_ref is not None:
+            self.bullet_ghost_by_key.pop((id(entity.cmd_ref), entity.timeline_id), None)
+
+    def flush_removals(self):
+        if not self._removed_ids:
+            return
+        removed = self._removed_ids
+        self.entities[:] = [e for e in self.entities if id(e) not in removed]
+        for bucket in (self.timers, self.bullets, self.ghost_bullets, self.ghost_players):
+            bucket[:] = [e for e in bucket if id(e) not in removed]
+        removed.clear()
+
 class Command:
     def __init__(self, target, data, forward_fn, backward_fn, scheduled_time):
         self.target = target
@@ -52,6 +142,7 @@ class Command:
         self.backward_fn = backward_fn
         self.scheduled_time = scheduled_time
         self.executed = False
+        self.kind = CMD_NONE
 
     def execute(self):
         if not self.executed:
@@ -66,7 +157,10 @@ class Command:
 class TimeEntity:
     def __init__(self, pos, color=(255, 255, 255), max_lifetime=float('inf')    ):
         self.pos = pygame.Vector2(pos)
+        self.draw_pos = (int(self.pos.x), int(self.pos.y))
         self.color = color
+        self.kind = KIND_ENTITY
+        self.timeline_id = None
         self.local_time = 0.0
         self.command_queue = []
         self.command_index = 0
@@ -82,7 +176,7 @@ class TimeEntity:
         )
 
     def update(self, dt, global_time, rewinding=False):
-        time_factor = get_time_factor(self.pos, pygame.Vector2(400, 300), 500)
+        time_factor = time_factor_at(self.pos.x, self.pos.y)
         local_dt = -dt if rewinding else dt
         self.local_time += local_dt * time_factor
 
@@ -119,7 +213,10 @@ class TimeEntity:
 class Timer(TimeEntity):
     def __init__(self, pos):
         super().__init__(pos, color=(255, 255, 0))
+        self.kind = KIND_TIMER
         self.count = 0.0
+        # Timers never move, so the label position is fixed
+        self.label_pos = self.pos + pygame.Vector2(12, -8)
 
     def update(self, dt, global_time, rewinding=False):
         prev_local_time = self.local_time
@@ -130,32 +227,56 @@ class Timer(TimeEntity):
 class MovementComponent:
     def __init__(self):
         self.path = []  # List of (scheduled_time, pos) tuples, sorted by time
+        self.times = []  # Parallel list of just the times
+        # np.searchsorted wants a contiguous array; the path grows by
+        # appends, so keep the list as the source of truth and rebuild
+        # the array lazily when a lookup sees it has gone stale.
+        self._times_arr = None
 
     def add_step(self, scheduled_time, pos):
         self.path.append((scheduled_time, pos))
+        self.times.append(scheduled_time)
+        self._times_arr = None
 
     def ensure_path(self, until_time, step_size, start_pos, velocity):
-        # Fill path up to until_time, starting from last or start_pos
-        last_time = self.path[-1][0] if self.path else 0
+        # Fill path up to until_time, starting from last or start_pos.
+        # Integrate in plain floats; this runs on every bullet spawn, so
+        # only allocate the one Vector2 per step that the path stores.
+        t = self.path[-1][0] if self.path else 0
         last_pos = self.path[-1][1] if self.path else start_pos
-        t = last_time
+        x, y = last_pos.x, last_pos.y
+        step_x = velocity.x * step_size
+        step_y = velocity.y * step_size
         while t < until_time:
             t += step_size
-            time_factor = get_time_factor(last_pos, pygame.Vector2(400, 300), 500)
-            last_pos = last_pos + velocity * step_size * time_factor
-            self.path.append((t, last_pos.copy()))
+            time_factor = time_factor_at(x, y)
+            x += step_x * time_factor
+            y += step_y * time_factor
+            self.path.append((t, pygame.Vector2(x, y)))
+            self.times.append(t)
+        self._times_arr = None
 
     def get_pos(self, query_time):
         if not self.path:
             return None
-        prev_time, prev_pos = self.path[0]
-        for next_time, next_pos in self.path[1:]:
-            if query_time <= next_time:
-                if next_time > prev_time:
-                    alpha = (query_time - prev_time) / (next_time - prev_time)
-                else:
-                    alpha = 0
-                alpha = max(0.0, min(1.0, alpha))  # Clamp to [0, 1]
-                return prev_pos.lerp(next_pos, alpha)
-            prev_time, prev_pos = next_time, next_pos
-        return self.path[-1][1]
\ No newline at end of file
+        if len(self.times) != len(self.path):
+            # Path was assigned wholesale (ghost paths, branch truncation);
+            # rebuild the time column so the lookups stay in sync.
+            self.times = [step[0] for step in self.path]
+            self._times_arr = None
+        times = self._times_arr
+        if times is None or times.size != len(self.times):
+            times = self._times_arr = np.asarray(self.times)
+        i = int(np.searchsorted(times, query_time, side='right')) - 1
+        if i < 0:
+            i = 0
+        if i + 1 >= len(self.path):
+            return self.path[-1][1]
+        prev_time, prev_pos = self.path[i]
+        next_time, next_pos = self.path[i + 1]
+        if next_time > prev_time:
+            alpha = (query_time - prev_time) / (next_time - prev_time)
+        else:
+            alpha = 0
+        alpha = max(0.0, min(1.0, alpha))  # Clamp to [0, 1]
+        return prev_pos.lerp(next_pos, alpha)
\ No newline at end of file